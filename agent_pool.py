@@ -0,0 +1,111 @@
+# agent_pool.py
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
+
+# Copied once at import instead of per spawn. Agents inherit the full environment
+# (proxies, CA bundles, locale, tool API keys...) and load the project .env themselves.
+AGENT_BASE_ENV = os.environ.copy()
+
+
+class AgentPool:
+    """Keeps pre-warmed worker processes (see worker.py) ready to host an agent.
+
+    Workers are single-use: a checked-out worker becomes the agent's server process
+    for the rest of its life, so every checkout spawns a replacement to keep the
+    pool topped up.
+    """
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        return subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT],
+            env={**AGENT_BASE_ENV, "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "")},
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            start_new_session=os.name == 'posix', # Own process group so stop can killpg
+            close_fds=False if sys.platform == 'darwin' else True,
+        )
+
+    def fill(self):
+        """Spawns workers until the pool holds `size` idle workers."""
+        with self._lock:
+            while self._idle.qsize() < self.size:
+                self._idle.put(self._spawn())
+
+    def checkout(self):
+        """Takes a live idle worker, spawning one directly if the pool is empty."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = self._spawn()
+                break
+            if worker.poll() is None:
+                break
+            print(f"Discarding dead pool worker {worker.pid} (exit code {worker.returncode})", file=sys.stderr)
+        self.fill()
+        return worker
+
+    def _discard(self, worker):
+        """Kills a worker that failed to load an agent and reaps it."""
+        if worker.poll() is None:
+            worker.kill()
+        for stream in (worker.stdin, worker.stdout):
+            try:
+                stream.close()
+            except OSError: # Still-buffered command for a dead worker
+                pass
+        worker.wait()
+
+    def launch(self, file_path, port, log_file, timeout=None):
+        """Loads an agent file into a pre-warmed worker and returns the worker process.
+
+        Blocks until the worker acknowledges that the agent module loaded, for at
+        most timeout seconds; raises RuntimeError if it failed to load, the worker
+        died or the ack timed out (the worker is killed).
+        """
+        worker = self.checkout()
+        command = {
+            "op": "load",
+            "path": os.path.abspath(file_path),
+            "port": port,
+            "log": os.path.abspath(log_file),
+        }
+        try:
+            worker.stdin.write(json.dumps(command) + "\n")
+            worker.stdin.close() # Flushes the command; the worker reads a single line
+        except OSError as e: # Worker died after checkout
+            self._discard(worker)
+            raise RuntimeError(f"Agent worker {worker.pid} exited before loading the agent (exit code {worker.returncode})") from e
+
+        # Read the ack on a thread so the wait can be bounded on every platform
+        ack_lines = []
+        reader = threading.Thread(target=lambda: ack_lines.append(worker.stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(timeout)
+        if reader.is_alive():
+            worker.kill() # Closes the pipe, which ends the reader's readline()
+            reader.join()
+            self._discard(worker)
+            raise RuntimeError(f"Agent worker {worker.pid} did not load the agent within {timeout}s")
+        worker.stdout.close()
+
+        line = ack_lines[0] if ack_lines else ""
+        if not line:
+            raise RuntimeError(f"Agent worker {worker.pid} exited before loading the agent (exit code {worker.wait()})")
+        ack = json.loads(line)
+        if not ack.get("ok"):
+            worker.wait()
+            raise RuntimeError(f"Agent worker failed to load the agent: {ack.get('error')}")
+        return worker
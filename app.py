@@ -2,31 +2,70 @@
 import os
 import subprocess
 import json
+import re
+import functools
 import uuid
 import signal
+import select
+import socket
 import time
 import sys
-from flask import Flask, jsonify, request
+import requests
+from concurrent.futures import ThreadPoolExecutor
+import msgspec
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+import sqlalchemy as sa
+from sqlalchemy import event, exists
+from sqlalchemy.engine import Engine
 from dotenv import load_dotenv
 from models import db, Users, Agents, Models # Import from models.py
+from schemas import AgentSummary, AGENT_SUMMARY_COLUMNS, UserOut, USER_COLUMNS, ModelOut, MODEL_COLUMNS
+from agent_pool import AgentPool
+from json_provider import MsgspecJSONProvider
 
 load_dotenv()
 
 # --- Configuration ---
-BASE_AGENT_PORT = 6000 # Starting port for agents
 AGENT_DIR = "agents" # Directory to store agent files
-AGENT_TEMPLATE_FILE = "agent_template.py"
+AGENT_TEMPLATE_FILE = "agent_template.py" # Per-agent config, served by base_agent.py
 TOOL_MAPPING_FILE = "mapping.json"
+STREAM_CHUNK_ROWS = 500 # Rows fetched and encoded per chunk when streaming lists
+STOP_TIMEOUT = 2 # Seconds to wait after SIGTERM before SIGKILL
+READY_TIMEOUT = 5 # Seconds to wait for a started agent to answer /health
+LOAD_TIMEOUT = 20 # Seconds for a pool worker to load an agent; a cold-spawned worker also imports agno and its tools
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 100)) # Log queries slower than this
+AGENT_RUNTIME = os.getenv("AGENT_RUNTIME", "process") # 'process' (one server per agent) or 'thread' (hosted in this app)
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", os.cpu_count() or 1)) # Pre-warmed agent workers
 
 # --- App Initialization ---
 app = Flask(__name__)
+app.json = MsgspecJSONProvider(app)
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+    "pool_size": 10,
+    "max_overflow": 20,
+    "pool_pre_ping": True, # Drop connections the server closed while idle
+    "pool_recycle": 1800,
+}
 db.init_app(app) # Associate db with the app
+agent_pool = AgentPool(AGENT_POOL_SIZE)
+running_agents = {} # agentid -> Agent object hosted in this process (AGENT_RUNTIME=thread)
+agent_processes = {} # agentid -> (Popen, pidfd) of an agent process started by this server (Linux 5.3+)
 
 # --- Helper Functions ---
 
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    if elapsed_ms > SLOW_QUERY_MS:
+        print(f"Slow query ({elapsed_ms:.0f} ms): {statement}", file=sys.stderr)
+
 # Create agent directory if it doesn't exist
 if not os.path.exists(AGENT_DIR):
     os.makedirs(AGENT_DIR)
@@ -42,35 +81,227 @@ except json.JSONDecodeError:
     print(f"Error: Could not decode {TOOL_MAPPING_FILE}. Check its format.")
     tool_mapping = {}
 
+# Pre-rendered (import line, tools list entry) for each permission
+PERMISSION_RENDER = {
+    perm_name: (mapping["import"], f"    {mapping['tool']},") # Indented for list
+    for perm_name, mapping in tool_mapping.items()
+}
+
+# The template's placeholders, expanded in a single pass; other braces are left alone
+TEMPLATE_PLACEHOLDER = re.compile(r"\{(imports|tools|instructions|agent_id)\}")
+
+# Load the agent template once; it does not change at runtime
+try:
+    with open(AGENT_TEMPLATE_FILE, 'r') as f:
+        agent_template = f.read()
+except FileNotFoundError:
+    print(f"Error: {AGENT_TEMPLATE_FILE} not found. Agent creation will fail.")
+    agent_template = None
+
+
+@functools.lru_cache(maxsize=512)
+def render_tools(permissions):
+    """Returns (imports, tools) code for a tuple of valid permissions; agents often share a set."""
+    imports_str = "\n    ".join(PERMISSION_RENDER[perm_name][0] for perm_name in permissions) # Inside build_tools()
+    tools_str = "\n".join(PERMISSION_RENDER[perm_name][1] for perm_name in permissions)
+    return imports_str, tools_str
+
+
+def render_agent_code(agent_id, permissions, instructions):
+    """Renders the agent source from the template. Returns (code, valid_permissions)."""
+    if agent_template is None:
+        raise FileNotFoundError(f"{AGENT_TEMPLATE_FILE} not found")
+
+    valid_permissions = []
+    for perm_name in permissions:
+        if perm_name in PERMISSION_RENDER:
+            valid_permissions.append(perm_name)
+        else:
+            print(f"Warning: Permission '{perm_name}' not found in mapping.json. Skipping.")
+    imports_str, tools_str = render_tools(tuple(valid_permissions))
+
+    replacements = {
+        "imports": imports_str,
+        "tools": tools_str,
+        "instructions": json.dumps(instructions, ensure_ascii=False)[1:-1], # Escapes quotes, backslashes and control chars; keeps non-ASCII as-is
+        "agent_id": agent_id,
+    }
+    agent_code = TEMPLATE_PLACEHOLDER.sub(lambda m: replacements[m.group(1)], agent_template)
+    return agent_code, valid_permissions
+
+
+def generate_agent_file(agent_id, permissions, instructions):
+    """Renders and writes the agent's .py file. Returns (file_path, valid_permissions)."""
+    file_path = os.path.join(AGENT_DIR, f"{agent_id}.py")
+    agent_code, valid_permissions = render_agent_code(agent_id, permissions, instructions)
 
-def find_available_port(start_port):
-    """Finds an available port starting from start_port."""
-    running_agents = Agents.query.filter(Agents.status == 'running', Agents.port.isnot(None)).all()
-    used_ports = {agent.port for agent in running_agents}
-    port = start_port
-    while port in used_ports or is_port_in_use(port): # Check DB and system
-        port += 1
-        if port > 65535:
-            raise Exception("No available ports found.")
-    return port
-
-def is_port_in_use(port):
-    """Check if a port is actively in use on the system (basic check)."""
-    import socket
+    # Write to a temp file, then rename so a half-written agent is never visible.
+    # No fsync: the DB row is the durable record of the agent.
+    tmp_path = file_path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0), 0o640)
+    try:
+        try:
+            view = memoryview(agent_code.encode())
+            while view: # os.write may write only part of the buffer
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        remove_agent_file(tmp_path)
+        raise
+    return file_path, valid_permissions
+
+
+def remove_agent_file(file_path):
+    """Best-effort cleanup of a generated agent file."""
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+            print(f"Cleaned up file: {file_path}")
+        except OSError as rm_err:
+            print(f"Error cleaning up file {file_path}: {rm_err}", file=sys.stderr)
+
+
+def find_available_port():
+    """Lets the kernel pick a free ephemeral port for an agent."""
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_agent(process, agent_id, port, timeout=READY_TIMEOUT):
+    """Polls until the agent's port accepts connections, then checks /health.
+
+    Fails fast if the agent process exits; raises if it isn't ready within timeout
+    or if the server answering on the port isn't this agent.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if process.poll() is not None:
+            raise Exception(f"Agent process exited during startup. Exit code: {process.returncode}")
         try:
-            # Try to bind to the port on localhost
-            s.bind(("127.0.0.1", port))
-            return False # Port is available
-        except socket.error:
-            return True # Port is likely in use
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            if time.monotonic() >= deadline:
+                raise Exception(f"Agent did not listen on port {port} within {timeout}s")
+            time.sleep(0.05)
+
+    response = requests.get(f"http://127.0.0.1:{port}/health", timeout=0.2)
+    response.raise_for_status()
+    # Another agent may have taken the port between find_available_port() and our bind
+    served_id = response.json().get("agent_id")
+    if served_id != agent_id:
+        raise Exception(f"Port {port} is served by agent {served_id}, not {agent_id}")
+    if process.poll() is not None:
+        raise Exception(f"Agent process exited during startup. Exit code: {process.returncode}")
+
+
+def open_pidfd(pid):
+    """Returns a pidfd for pid, or None where pidfds aren't supported."""
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError: # Kernel older than 5.3
+        return None
+
+def pidfd_exited(pidfd, timeout=0):
+    """Waits up to timeout seconds for the process behind pidfd to exit."""
+    # poll() rather than select(), which can't watch fds >= 1024
+    poller = select.poll()
+    poller.register(pidfd, select.POLLIN)
+    return bool(poller.poll(timeout * 1000))
+
+def close_pidfd(agent_id):
+    """Forgets the agent's process, reaping it if it has already exited."""
+    process, pidfd = agent_processes.pop(agent_id, (None, None))
+    if pidfd is not None:
+        os.close(pidfd)
+        process.poll()
+
+def agent_process_alive(agent):
+    """Checks the agent's process, through its pidfd when this server started it."""
+    _, pidfd = agent_processes.get(agent.agentid, (None, None))
+    if pidfd is not None:
+        return not pidfd_exited(pidfd)
+    try:
+        os.kill(agent.pid, 0) # Check if process exists without killing
+        return True
+    except OSError:
+        return False
+
+
+def json_rows(struct, rows):
+    """Encodes selected column rows as a JSON array of struct objects."""
+    return Response(msgspec.json.encode([struct(*row) for row in rows]), mimetype="application/json")
+
+
+def stream_json_rows(struct, statement, chunk_size=STREAM_CHUNK_ROWS):
+    """Streams a column select as a JSON array, one server-side cursor chunk at a time."""
+    def generate():
+        result = db.session.execute(statement.execution_options(stream_results=True))
+        yield b"["
+        first = True
+        for rows in result.partitions(chunk_size):
+            if not first:
+                yield b","
+            first = False
+            yield msgspec.json.encode([struct(*row) for row in rows])[1:-1] # Drop the chunk's brackets
+        yield b"]"
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def start_agent_in_process(agent):
+    """Builds the agent inside this process and serves it at /agents/<id>/chat."""
+    if agent.agentid in running_agents:
+        return jsonify({"message": f"Agent {agent.agentid} is already running"}), 200
+
+    import base_agent # Only the thread runtime needs agno in this process
+
+    try:
+        built = base_agent.build_agent(base_agent.load_config(agent.file_path))
+    except (Exception, SystemExit) as e:
+        print(f"Error starting agent {agent.agentid}: {e}", file=sys.stderr)
+        agent.status = 'error'
+        agent.pid = None
+        agent.port = None
+        db.session.commit()
+        return jsonify({"error": f"Failed to start agent: {e}"}), 500
+
+    running_agents[agent.agentid] = built
+    agent.status = 'running'
+    agent.pid = None
+    agent.port = None
+    db.session.commit()
+
+    print(f"Agent {agent.agentid} started in-process.")
+    return jsonify({
+        "message": f"Agent {agent.agentid} started successfully",
+        "agent_id": agent.agentid,
+        "chat_url": f"/agents/{agent.agentid}/chat",
+    }), 200
+
+
+def stop_agent_in_process(agent):
+    """Drops an agent hosted in this process."""
+    if running_agents.pop(agent.agentid, None) is None and agent.status != 'running':
+        return jsonify({"message": f"Agent {agent.agentid} is not running."}), 200
+
+    agent.status = 'stopped'
+    agent.pid = None
+    agent.port = None
+    db.session.commit()
+    return jsonify({"message": f"Agent {agent.agentid} stopped successfully."}), 200
 
 
 # --- Agent Management Routes ---
 
 @app.route("/agents", methods=["POST"])
 def create_agent():
-    """Creates a new agent definition and its .py file."""
+    """Creates a new agent definition and its .py config file."""
     data = request.get_json()
     if not data:
         return jsonify({"error": "Request body required"}), 400
@@ -84,48 +315,20 @@ def create_agent():
 
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
+    if not isinstance(instructions, str):
+        return jsonify({"error": "instructions must be a string"}), 400
 
     # Validate user exists (optional but recommended)
     user = Users.query.get(user_id)
     if not user:
         return jsonify({"error": f"User with id {user_id} not found"}), 404
 
-    # Generate unique agent ID and file path
+    # Generate unique agent ID
     agent_id = uuid.uuid4().hex[:10] # Shorter unique ID
-    file_path = os.path.join(AGENT_DIR, f"{agent_id}.py")
 
     # --- Generate Agent Code ---
     try:
-        with open(AGENT_TEMPLATE_FILE, 'r') as f_template:
-            template_code = f_template.read()
-
-        imports_code = []
-        tools_code = []
-        valid_permissions = []
-
-        for perm_name in permissions:
-            if perm_name in tool_mapping:
-                mapping = tool_mapping[perm_name]
-                imports_code.append(mapping["import"])
-                tools_code.append(f"    {mapping['tool']},") # Indented for list
-                valid_permissions.append(perm_name)
-            else:
-                print(f"Warning: Permission '{perm_name}' not found in mapping.json. Skipping.")
-
-        # Format for insertion into template
-        imports_str = "\n".join(imports_code)
-        tools_str = "\n".join(tools_code)
-
-        # Replace placeholders
-        agent_code = template_code.replace("{imports}", imports_str)
-        agent_code = agent_code.replace("{tools}", tools_str)
-        agent_code = agent_code.replace("{instructions}", instructions.replace('"', '\\"')) # Basic escaping for instructions
-        agent_code = agent_code.replace("{agent_id}", agent_id)
-
-
-        # Write the generated code to the agent's file
-        with open(file_path, 'w') as f_agent:
-            f_agent.write(agent_code)
+        file_path, valid_permissions = generate_agent_file(agent_id, permissions, instructions)
         print(f"Generated agent file: {file_path}")
 
     except Exception as e:
@@ -140,7 +343,7 @@ def create_agent():
             userId=user_id,
             name=name,
             description=description,
-            permissions=json.dumps(valid_permissions), # Store valid permissions as JSON list
+            permissions=valid_permissions, # Stored as JSONB
             pcode=pcode, # Add pcode to the new agent
             instructions=instructions,
             file_path=file_path,
@@ -158,21 +361,100 @@ def create_agent():
         db.session.rollback()
         print(f"Error saving agent {agent_id} to database: {e}", file=sys.stderr)
         # Clean up generated file if DB save fails
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"Cleaned up file: {file_path}")
-            except OSError as rm_err:
-                print(f"Error cleaning up file {file_path}: {rm_err}", file=sys.stderr)
+        remove_agent_file(file_path)
         return jsonify({"error": f"Failed to save agent to database: {e}"}), 500
     # --- End Create Agent Record ---
 
 
+@app.route("/agents/batch", methods=["POST"])
+def create_agents_batch():
+    """Creates many agents at once with a single INSERT and commit."""
+    data = request.get_json()
+    specs = data.get("agents") if isinstance(data, dict) else None
+    if not specs or not isinstance(specs, list):
+        return jsonify({"error": "Request body must contain a non-empty 'agents' list"}), 400
+
+    if not all(isinstance(spec, dict) for spec in specs):
+        return jsonify({"error": "Every entry in 'agents' must be an object"}), 400
+    if any(spec.get("userId") is None for spec in specs):
+        return jsonify({"error": "userId is required for every agent"}), 400
+    # Users.id is an integer; bool is an int subclass but never a valid id
+    if any(not isinstance(spec["userId"], int) or isinstance(spec["userId"], bool) for spec in specs):
+        return jsonify({"error": "userId must be an integer"}), 400
+    if any(not isinstance(spec.get("instructions", ""), str) for spec in specs):
+        return jsonify({"error": "instructions must be a string"}), 400
+    if any(not isinstance(spec.get("name", ""), str) for spec in specs):
+        return jsonify({"error": "name must be a string"}), 400
+    if any(not isinstance(spec.get("description", ""), str) for spec in specs):
+        return jsonify({"error": "description must be a string"}), 400
+    if any(not isinstance(spec.get("pcode", ""), (str, type(None))) for spec in specs):
+        return jsonify({"error": "pcode must be a string"}), 400
+    # A bare string would be iterated character by character into no tools
+    permission_lists = [spec.get("permissions", []) for spec in specs]
+    if any(not isinstance(perms, list) or not all(isinstance(p, str) for p in perms) for perms in permission_lists):
+        return jsonify({"error": "permissions must be a list of strings"}), 400
+
+    user_ids = {spec["userId"] for spec in specs}
+
+    # Validate all users in one query
+    found_ids = {row.id for row in Users.query.filter(Users.id.in_(user_ids)).with_entities(Users.id).all()}
+    missing_ids = user_ids - found_ids
+    if missing_ids:
+        return jsonify({"error": f"Users not found: {sorted(missing_ids)}"}), 404
+
+    rows = [{
+        "agentid": uuid.uuid4().hex[:10],
+        "userId": spec["userId"],
+        "name": spec.get("name", "Untitled Agent"),
+        "description": spec.get("description", ""),
+        "pcode": spec.get("pcode"),
+        "instructions": spec.get("instructions", "You are a helpful AI assistant."),
+        "status": 'created',
+    } for spec in specs]
+
+    # --- Generate Agent Code (I/O bound, so in parallel) ---
+    try:
+        with ThreadPoolExecutor(max_workers=min(8, len(rows))) as executor:
+            futures = [
+                executor.submit(generate_agent_file, row["agentid"], spec.get("permissions", []), row["instructions"])
+                for row, spec in zip(rows, specs)
+            ]
+            for row, future in zip(rows, futures):
+                row["file_path"], row["permissions"] = future.result()
+    except Exception as e:
+        print(f"Error generating agent files for batch: {e}", file=sys.stderr)
+        for row in rows:
+            remove_agent_file(os.path.join(AGENT_DIR, f"{row['agentid']}.py"))
+        return jsonify({"error": f"Failed to generate agent files: {e}"}), 500
+
+    # --- Create Agent Records in DB ---
+    try:
+        db.session.bulk_insert_mappings(Agents, rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving agent batch to database: {e}", file=sys.stderr)
+        for row in rows:
+            remove_agent_file(row["file_path"])
+        return jsonify({"error": f"Failed to save agents to database: {e}"}), 500
+
+    return jsonify({
+        "message": f"{len(rows)} agents created successfully",
+        "agents": [
+            {key: row[key] for key in ("agentid", "userId", "name", "permissions", "file_path", "status")}
+            for row in rows
+        ],
+    }), 201
+
+
 @app.route("/agents", methods=["GET"])
 def get_all_agents():
-    """Gets a list of all agents."""
-    agents = Agents.query.all()
-    return jsonify([agent.to_dict() for agent in agents])
+    """Gets a list of all agents, optionally filtered by ?permission=<name>."""
+    statement = sa.select(*AGENT_SUMMARY_COLUMNS)
+    permission = request.args.get("permission")
+    if permission:
+        statement = statement.where(Agents.permissions.contains([permission])) # Uses the GIN index
+    return stream_json_rows(AgentSummary, statement)
 
 @app.route("/agents/<string:agent_id>", methods=["GET"])
 def get_agent(agent_id):
@@ -192,12 +474,12 @@ def start_agent(agent_id):
 
     if agent.status == 'running' and agent.pid:
         # Check if the process actually exists
-        try:
-            os.kill(agent.pid, 0) # Check if process exists without killing
+        if agent_process_alive(agent):
             print(f"Agent {agent_id} already running with PID {agent.pid} on port {agent.port}")
             return jsonify({"message": f"Agent {agent_id} is already running", "port": agent.port}), 200
-        except OSError:
+        else:
             print(f"Agent {agent_id} status is 'running' but PID {agent.pid} not found. Resetting.")
+            close_pidfd(agent_id)
             agent.status = 'error' # Or 'stopped'
             agent.pid = None
             agent.port = None
@@ -207,67 +489,52 @@ def start_agent(agent_id):
     if not os.path.exists(agent.file_path):
          return jsonify({"error": f"Agent file {agent.file_path} not found."}), 404
 
+    if AGENT_RUNTIME == 'thread':
+        return start_agent_in_process(agent)
+
     try:
-        port = find_available_port(BASE_AGENT_PORT)
+        port = find_available_port()
     except Exception as e:
         print(f"Error finding port for agent {agent_id}: {e}", file=sys.stderr)
         return jsonify({"error": str(e)}), 500
 
-    # Environment variables for the subprocess
-    agent_env = os.environ.copy()
-    agent_env["FLASK_PORT"] = str(port)
-    # Make sure GROQ key is passed (or any other needed keys)
-    agent_env["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY", "") # Pass it explicitly
-
-    command = [sys.executable, agent.file_path] # Use sys.executable for portability
-
     try:
-        print(f"Starting agent {agent_id} with command: {' '.join(command)} on port {port}")
+        print(f"Starting agent {agent_id} from {agent.file_path} on port {port}")
         
         # Create logs directory if it doesn't exist
         log_dir = "logs"
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
             
-        # Redirect stdout/stderr to a log file
+        # The worker redirects the agent's stdout/stderr to this log file
         log_file = os.path.join(log_dir, f"agent_{agent_id}.log")
+
+        # Hand the agent to a pre-warmed worker; returns once the worker acks the load
+        try:
+            process = agent_pool.launch(agent.file_path, port, log_file, timeout=LOAD_TIMEOUT)
+        except RuntimeError as e:
+            error_output = ""
+            if os.path.exists(log_file):
+                with open(log_file, 'r') as f:
+                    error_output = f.read()
+            raise Exception(f"Agent process failed to start: {e}\nLog output: {error_output[:500]}")
         
-        with open(log_file, 'w') as f:
-            process = subprocess.Popen(
-                command,
-                env=agent_env,
-                preexec_fn=os.setsid if os.name == 'posix' else None,
-                creationflags=0,
-                close_fds=False if sys.platform == 'darwin' else True,
-                stdout=f,
-                stderr=subprocess.STDOUT
-            )
-            
-        # Increase wait time to allow agent to start
-        time.sleep(5)
-        
-        # Verify the process is still running
-        if process.poll() is not None:
+        # Wait until the agent accepts connections and answers /health
+        try:
+            wait_for_agent(process, agent_id, port)
+        except Exception as e:
+            if process.poll() is None:
+                process.kill()
             with open(log_file, 'r') as f:
                 error_output = f.read()
-            raise Exception(f"Agent process failed to start. Exit code: {process.poll()}\nLog output: {error_output[:500]}")
-        
-        # Verify the agent is responsive by checking health endpoint
-        import requests
-        health_check_url = f"http://localhost:{port}/health"
-        max_retries = 3
-        
-        for i in range(max_retries):
-            try:
-                response = requests.get(health_check_url, timeout=1)
-                if response.status_code == 200:
-                    break
-            except requests.RequestException as e:
-                if i == max_retries - 1:  # Last attempt failed
-                    with open(log_file, 'r') as f:
-                        error_output = f.read()
-                    raise Exception(f"Agent started but health check failed: {str(e)}\nLog output: {error_output[:500]}")
-                time.sleep(1)
+            raise Exception(f"Agent started but health check failed: {e}\nLog output: {error_output[:500]}")
+
+        # Keep a pidfd so liveness checks and signals can't hit a recycled PID. Holding
+        # the Popen too stops subprocess reaping the exited agent (freeing its PID and
+        # group ID) before stop_agent has signalled its group.
+        pidfd = open_pidfd(process.pid)
+        if pidfd is not None:
+            agent_processes[agent_id] = (process, pidfd)
 
         # Update agent status in database
         agent.status = 'running'
@@ -290,6 +557,18 @@ def start_agent(agent_id):
         agent.port = None
         db.session.commit()
         return jsonify({"error": f"Failed to start agent: {e}"}), 500
+
+
+@app.route("/agents/<string:agent_id>/stop", methods=["POST"])
+def stop_agent(agent_id):
+    """Stops the agent's running process."""
+    agent = Agents.query.filter_by(agentid=agent_id).first()
+    if not agent:
+        return jsonify({"message": "Agent not found"}), 404
+
+    if AGENT_RUNTIME == 'thread':
+        return stop_agent_in_process(agent)
+
     if agent.status != 'running' or not agent.pid:
         # If status is running but no PID, something is wrong. Fix it.
         if agent.status == 'running' and not agent.pid:
@@ -301,31 +580,47 @@ def start_agent(agent_id):
 
     pid_to_kill = agent.pid
     print(f"Attempting to stop agent {agent_id} with PID {pid_to_kill}...")
+    process, pidfd = agent_processes.get(agent_id, (None, None))
 
     try:
-        # Try terminating gracefully first
-        if os.name == 'posix':
-             # Kill the entire process group started with os.setsid
-             os.killpg(os.getpgid(pid_to_kill), signal.SIGTERM)
-        elif os.name == 'nt':
-             # Windows: Use taskkill
-             subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid_to_kill)], check=True, capture_output=True)
-             # os.kill(pid_to_kill, signal.SIGTERM) # SIGTERM might not be forceful enough on Windows often
-
-        # Wait a moment for the process to terminate
-        time.sleep(1)
-
-        # Check if it's still alive
-        try:
-            os.kill(pid_to_kill, 0) # Check if process exists
-            # If it exists, force kill (use SIGKILL on POSIX)
-            print(f"Process {pid_to_kill} still alive after SIGTERM. Force killing.")
+        if pidfd is not None:
+            if pidfd_exited(pidfd):
+                # Don't signal by PID or group ID once the agent has exited
+                print(f"Process {pid_to_kill} already exited.")
+            else:
+                # Until we reap it, the agent's PID and group ID can't be recycled, so its
+                # group (the agent and any children it spawned) is ours to signal. Wait
+                # on the pidfd instead of sleeping.
+                os.killpg(pid_to_kill, signal.SIGTERM)
+                if not pidfd_exited(pidfd, STOP_TIMEOUT):
+                    print(f"Process {pid_to_kill} still alive after SIGTERM. Force killing.")
+                # Also clears children that outlived the agent
+                os.killpg(pid_to_kill, signal.SIGKILL)
+                process.wait()
+        else:
+            # Try terminating gracefully first
             if os.name == 'posix':
-                os.killpg(os.getpgid(pid_to_kill), signal.SIGKILL)
-            # taskkill with /F already force kills on Windows
-        except OSError:
-            # Process already terminated
-            pass
+                 # Kill the entire process group started with os.setsid
+                 os.killpg(os.getpgid(pid_to_kill), signal.SIGTERM)
+            elif os.name == 'nt':
+                 # Windows: Use taskkill
+                 subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid_to_kill)], check=True, capture_output=True)
+                 # os.kill(pid_to_kill, signal.SIGTERM) # SIGTERM might not be forceful enough on Windows often
+
+            # Wait a moment for the process to terminate
+            time.sleep(1)
+
+            # Check if it's still alive
+            try:
+                os.kill(pid_to_kill, 0) # Check if process exists
+                # If it exists, force kill (use SIGKILL on POSIX)
+                print(f"Process {pid_to_kill} still alive after SIGTERM. Force killing.")
+                if os.name == 'posix':
+                    os.killpg(os.getpgid(pid_to_kill), signal.SIGKILL)
+                # taskkill with /F already force kills on Windows
+            except OSError:
+                # Process already terminated
+                pass
 
         print(f"Successfully sent termination signal to PID {pid_to_kill} for agent {agent_id}.")
 
@@ -340,6 +635,9 @@ def start_agent(agent_id):
         db.session.commit()
         return jsonify({"error": f"An error occurred while trying to stop the agent process: {e}"}), 500
 
+    finally:
+        close_pidfd(agent_id)
+
     # Update database record
     agent.status = 'stopped'
     agent.pid = None
@@ -349,30 +647,45 @@ def start_agent(agent_id):
     return jsonify({"message": f"Agent {agent_id} stopped successfully."}), 200
 
 
+@app.route("/agents/<string:agent_id>/chat", methods=["POST"])
+def chat_with_agent(agent_id):
+    """Sends a prompt to an agent hosted in this process (AGENT_RUNTIME=thread)."""
+    agent = running_agents.get(agent_id)
+    if agent is None:
+        return jsonify({"error": f"Agent {agent_id} is not running in this process"}), 404
+
+    data = request.get_json()
+    if not data or "prompt" not in data:
+        return jsonify({"error": "Missing 'prompt' in request body"}), 400
+
+    try:
+        response = agent.run(data["prompt"]).content
+        return jsonify({"response": response})
+    except Exception as e:
+        print(f"Error during agent {agent_id} run: {e}", file=sys.stderr)
+        return jsonify({"error": "Agent failed to process the request"}), 500
+
+
 # --- User and Model Routes (from original prompt, slightly adapted) ---
 
 @app.route("/users", methods=["GET"])
 def get_all_users():
-    # Using the to_dict method from the model for consistency
-    users = Users.query.all()
-    return jsonify([user.to_dict() for user in users])
+    return json_rows(UserOut, db.session.execute(sa.select(*USER_COLUMNS)))
 
 # Add POST /users for creation (ensure password hashing!)
 
 @app.route("/users/<int:user_id>/agents", methods=["GET"])
 def get_agents_by_user(user_id):
-    user = Users.query.get(user_id)
-    if not user:
+    rows = db.session.execute(sa.select(*AGENT_SUMMARY_COLUMNS).where(Agents.userId == user_id)).all()
+    # Only pay for the user lookup when there are no agents to prove the user exists
+    if not rows and not db.session.query(exists().where(Users.id == user_id)).scalar():
         return jsonify({"message": "User not found"}), 404
-
-    agents = Agents.query.filter_by(userId=user_id).all()
-    return jsonify([agent.to_dict() for agent in agents])
+    return json_rows(AgentSummary, rows)
 
 
 @app.route("/models", methods=["GET"])
 def get_all_models():
-    models = Models.query.all()
-    return jsonify([model.to_dict() for model in models])
+    return json_rows(ModelOut, db.session.execute(sa.select(*MODEL_COLUMNS)))
 
 @app.route("/models", methods=["POST"])
 def create_model():
@@ -404,11 +717,20 @@ def get_model(model_id):
 
 # --- Main Execution ---
 
+# Pre-warm the worker pool for `python app.py` and WSGI servers alike. With the debug
+# reloader, only the serving child (WERKZEUG_RUN_MAIN) does, not the watching parent.
+if AGENT_RUNTIME == 'process' and (os.getenv("FLASK_DEBUG") != '1' or os.getenv("WERKZEUG_RUN_MAIN") == 'true'):
+    print(f"Pre-warming {AGENT_POOL_SIZE} agent workers...")
+    agent_pool.fill()
+
+
 if __name__ == "__main__":
-    with app.app_context():
-        print("Creating database tables if they don't exist...")
-        db.create_all()
-        print("Database tables checked/created.")
+    # Set MANAGEMENT_BOOTSTRAP=0 to skip the table check, e.g. when migrations manage the schema
+    if os.getenv("MANAGEMENT_BOOTSTRAP", '1') != '0':
+        with app.app_context():
+            print("Creating database tables if they don't exist...")
+            db.create_all()
+            print("Database tables checked/created.")
     # Port for the main management API server
     management_port = int(os.getenv("MANAGEMENT_PORT", 5000))
     print(f"Starting Management API server on port {management_port}...")
@@ -0,0 +1,153 @@
+# base_agent.py
+"""Shared agent server.
+
+Each agent's generated file (agents/<id>.py, rendered from agent_template.py) only
+holds its tools and instructions; this module builds the agent from it and serves
+it. Run directly with AGENT_CONFIG_PATH pointing at a generated file, or loaded by
+worker.py / the in-process runtime. Being a single module, CPython compiles it
+once and every agent start reuses the cached .pyc.
+
+agno and the tool packages are imported when the agent is first built, so a
+directly-run agent binds its port and answers /health before paying for them.
+"""
+import functools
+import importlib.util
+import os
+import sys
+import threading
+import logging
+from flask import Flask, request, jsonify
+from dotenv import load_dotenv
+from json_provider import MsgspecJSONProvider
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('base_agent')
+
+# Load .env from the main project directory
+project_root = os.path.dirname(os.path.abspath(__file__))
+dotenv_path = os.path.join(project_root, '.env')
+if os.path.exists(dotenv_path):
+    load_dotenv(dotenv_path=dotenv_path)
+    logger.info(f"Loaded .env from {dotenv_path}")
+else:
+    load_dotenv()
+    logger.info("Loaded .env from current directory")
+
+logger.info(f"GROQ_API_KEY present: {bool(os.getenv('GROQ_API_KEY'))}")
+
+
+def load_config(config_path):
+    """Imports a generated agent file as a module."""
+    name = os.path.splitext(os.path.basename(config_path))[0]
+    spec = importlib.util.spec_from_file_location(f"agents.{name}", config_path)
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    return config
+
+
+def is_full_source(config):
+    """Agent files generated before base_agent.py carry their own agent and server."""
+    return hasattr(config, "app")
+
+
+@functools.lru_cache(maxsize=1)
+def groq_http_client():
+    """One keep-alive HTTP/2 connection pool to the Groq API for all agents in this process."""
+    import httpx
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+def build_agent(config):
+    """Builds the agent described by a generated agent file."""
+    if is_full_source(config):
+        return config.agent
+
+    from agno.agent import Agent
+    from agno.models.groq import Groq
+
+    return Agent(
+        model=Groq(
+            id="llama-3.1-8b-instant", # Or make this configurable per agent later
+            api_key=os.getenv("GROQ_API_KEY"),
+            http_client=groq_http_client(),
+        ),
+        tools=config.build_tools(),
+        show_tool_calls=True,
+        instructions=config.agent_instructions,
+        add_datetime_to_instructions=True,
+    )
+
+
+def create_app(config, agent=None):
+    """Creates the Flask app serving /chat and /health for one agent.
+
+    Without a prebuilt agent, it is built on the first /chat request.
+    """
+    if is_full_source(config):
+        return config.app
+
+    agent_logger = logging.getLogger(config.agent_id)
+    app = Flask(config.agent_id)
+    app.json = MsgspecJSONProvider(app)
+
+    built = [agent]
+    build_lock = threading.Lock()
+
+    def get_agent():
+        # Threaded server: concurrent first requests must not each build an agent
+        if built[0] is None:
+            with build_lock:
+                if built[0] is None:
+                    agent_logger.info("Creating agent...")
+                    built[0] = build_agent(config)
+        return built[0]
+
+    @app.route("/chat", methods=["POST"])
+    def chat():
+        data = request.get_json()
+        if not data or "prompt" not in data:
+            return jsonify({"error": "Missing 'prompt' in request body"}), 400
+
+        prompt = data["prompt"]
+        try:
+            response = get_agent().run(prompt).content
+            return jsonify({"response": response})
+        except Exception as e:
+            agent_logger.error(f"Error during agent run: {str(e)}")
+            print(f"Error during agent run: {e}", file=sys.stderr) # Log error
+            return jsonify({"error": "Agent failed to process the request"}), 500
+
+    @app.route("/health", methods=["GET"])
+    def health_check():
+        # Simple health check endpoint
+        return jsonify({"status": "running", "agent_id": config.agent_id}), 200
+
+    return app
+
+
+if __name__ == "__main__":
+    config_path = os.getenv("AGENT_CONFIG_PATH")
+    if not config_path:
+        print("CRITICAL ERROR! AGENT_CONFIG_PATH is not set", file=sys.stderr)
+        sys.exit(1)
+    config = load_config(config_path)
+
+    # Port is passed via environment variable set by the main app
+    port = int(os.getenv("FLASK_PORT", 5001)) # Default if not set
+    print(f"Starting agent from {config_path} on port {port}...")
+
+    logger.info(f"Starting Flask server on port {port}")
+    try:
+        # Use host='0.0.0.0' to make it accessible externally if needed
+        create_app(config).run(host='0.0.0.0', port=port) # Removed debug=True for agent processes
+    except Exception as e:
+        logger.critical(f"Failed to start Flask server: {str(e)}")
+        print(f"CRITICAL ERROR! Failed to start Flask server: {str(e)}", file=sys.stderr)
+        sys.exit(1)
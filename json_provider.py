@@ -0,0 +1,22 @@
+# json_provider.py
+import msgspec
+from flask.json.provider import DefaultJSONProvider
+
+
+class MsgspecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by msgspec's C encoder/decoder.
+
+    Used by jsonify() and request.get_json(). Types msgspec can't encode natively
+    go through DefaultJSONProvider.default. Keys keep insertion order rather than
+    being sorted.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return msgspec.json.encode(obj, enc_hook=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        # Flask turns ValueError from loads() into a 400 Bad Request
+        try:
+            return msgspec.json.decode(s)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
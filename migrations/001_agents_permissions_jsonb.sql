@@ -0,0 +1,10 @@
+-- Convert agents.permissions from a JSON-encoded TEXT column to JSONB.
+-- New databases get this schema from db.create_all(); run this once on existing ones.
+BEGIN;
+
+ALTER TABLE agents
+    ALTER COLUMN permissions TYPE JSONB USING permissions::jsonb;
+
+CREATE INDEX IF NOT EXISTS ix_agents_perm ON agents USING gin (permissions);
+
+COMMIT;
@@ -0,0 +1,39 @@
+-- Make createdAt/updatedAt timezone-aware and filled in by Postgres.
+-- Existing naive values were written with the server's local time, so they are
+-- interpreted in the session TimeZone; set it to the app server's zone first if they differ.
+BEGIN;
+
+ALTER TABLE users
+    ALTER COLUMN "createdAt" TYPE TIMESTAMPTZ USING "createdAt"::timestamptz,
+    ALTER COLUMN "updatedAt" TYPE TIMESTAMPTZ USING "updatedAt"::timestamptz;
+UPDATE users SET "createdAt" = COALESCE("createdAt", now()), "updatedAt" = COALESCE("updatedAt", now())
+    WHERE "createdAt" IS NULL OR "updatedAt" IS NULL;
+ALTER TABLE users
+    ALTER COLUMN "createdAt" SET DEFAULT now(),
+    ALTER COLUMN "createdAt" SET NOT NULL,
+    ALTER COLUMN "updatedAt" SET DEFAULT now(),
+    ALTER COLUMN "updatedAt" SET NOT NULL;
+
+ALTER TABLE agents
+    ALTER COLUMN "createdAt" TYPE TIMESTAMPTZ USING "createdAt"::timestamptz,
+    ALTER COLUMN "updatedAt" TYPE TIMESTAMPTZ USING "updatedAt"::timestamptz;
+UPDATE agents SET "createdAt" = COALESCE("createdAt", now()), "updatedAt" = COALESCE("updatedAt", now())
+    WHERE "createdAt" IS NULL OR "updatedAt" IS NULL;
+ALTER TABLE agents
+    ALTER COLUMN "createdAt" SET DEFAULT now(),
+    ALTER COLUMN "createdAt" SET NOT NULL,
+    ALTER COLUMN "updatedAt" SET DEFAULT now(),
+    ALTER COLUMN "updatedAt" SET NOT NULL;
+
+ALTER TABLE models
+    ALTER COLUMN "createdAt" TYPE TIMESTAMPTZ USING "createdAt"::timestamptz,
+    ALTER COLUMN "updatedAt" TYPE TIMESTAMPTZ USING "updatedAt"::timestamptz;
+UPDATE models SET "createdAt" = COALESCE("createdAt", now()), "updatedAt" = COALESCE("updatedAt", now())
+    WHERE "createdAt" IS NULL OR "updatedAt" IS NULL;
+ALTER TABLE models
+    ALTER COLUMN "createdAt" SET DEFAULT now(),
+    ALTER COLUMN "createdAt" SET NOT NULL,
+    ALTER COLUMN "updatedAt" SET DEFAULT now(),
+    ALTER COLUMN "updatedAt" SET NOT NULL;
+
+COMMIT;
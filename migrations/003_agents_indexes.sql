@@ -0,0 +1,9 @@
+-- Indexes for the hot agents filters (agentid lookups, per-user listing).
+-- CONCURRENTLY avoids locking the table, so this file must run outside a transaction.
+
+-- Replaces the unique constraint from unique=True with the unique index that
+-- unique=True, index=True creates on new databases.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_agents_agentid ON agents (agentid);
+ALTER TABLE agents DROP CONSTRAINT IF EXISTS agents_agentid_key;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS "ix_agents_userId" ON agents ("userId");
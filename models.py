@@ -1,19 +1,25 @@
 # models.py
 import os
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import json
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql
 
 db = SQLAlchemy() # Initialize here, associate with app later
 
+
+def iso_timestamp(column):
+    """Has Postgres render a timestamp column the way to_dict() does, labelled with its name."""
+    return func.to_char(column, 'YYYY-MM-DD"T"HH24:MI:SSTZH:TZM').label(column.key)
+
+
 class Users(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False) # Remember to hash passwords!
     email_verified = db.Column(db.Boolean, default=False)
-    createdAt = db.Column(db.DateTime, default=datetime.now)
-    updatedAt = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updatedAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     def to_dict(self):
         return {
@@ -21,28 +27,32 @@ class Users(db.Model):
             "name": self.name,
             "email": self.email,
             "email_verified": self.email_verified,
-            "createdAt": self.createdAt.isoformat(),
-            "updatedAt": self.updatedAt.isoformat(),
+            "createdAt": self.createdAt.isoformat(timespec="seconds"),
+            "updatedAt": self.updatedAt.isoformat(timespec="seconds"),
         }
 
 class Agents(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    agentid = db.Column(db.String(50), unique=True, nullable=False) # Unique ID for the agent
-    userId = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    agentid = db.Column(db.String(50), unique=True, index=True, nullable=False) # Unique ID for the agent
+    userId = db.Column(db.Integer, db.ForeignKey("users.id"), index=True, nullable=False)
     name = db.Column(db.String(100), nullable=False, default="Untitled Agent")
     description = db.Column(db.Text, nullable=True)
-    permissions = db.Column(db.Text, nullable=True) # Store as JSON string list
+    permissions = db.Column(postgresql.JSONB, nullable=True) # List of permission names, decoded by the driver
     pcode = db.Column(db.String(100), nullable=True) # Added missing pcode field
     instructions = db.Column(db.Text, nullable=True) # Custom instructions base
     file_path = db.Column(db.String(255), nullable=False) # Path to the generated .py file
     status = db.Column(db.String(20), nullable=False, default='created') # e.g., 'created', 'running', 'stopped', 'error'
     port = db.Column(db.Integer, nullable=True) # Port the agent runs on when started
     pid = db.Column(db.Integer, nullable=True) # Process ID when running
-    createdAt = db.Column(db.DateTime, default=datetime.now)
-    updatedAt = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updatedAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = db.relationship("Users", backref=db.backref("agents", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_agents_perm", "permissions", postgresql_using="gin"), # Serves permissions @> filters
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -50,15 +60,15 @@ class Agents(db.Model):
             "userId": self.userId,
             "name": self.name,
             "description": self.description,
-            "permissions": json.loads(self.permissions) if self.permissions else [],
+            "permissions": self.permissions or [],
             "pcode": self.pcode,
             "instructions": self.instructions,
             "file_path": self.file_path,
             "status": self.status,
             "port": self.port,
             "pid": self.pid,
-            "createdAt": self.createdAt.isoformat(),
-            "updatedAt": self.updatedAt.isoformat(),
+            "createdAt": self.createdAt.isoformat(timespec="seconds"),
+            "updatedAt": self.updatedAt.isoformat(timespec="seconds"),
         }
 
 
@@ -69,8 +79,8 @@ class Models(db.Model):
     provider = db.Column(db.String(50), nullable=False)
     offline = db.Column(db.Boolean, default=False)
     endpoint = db.Column(db.String(255), nullable=True)
-    createdAt = db.Column(db.DateTime, default=datetime.now)
-    updatedAt = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    createdAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updatedAt = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     def to_dict(self):
          return {
@@ -80,6 +90,6 @@ class Models(db.Model):
             "provider": self.provider,
             "offline": self.offline,
             "endpoint": self.endpoint,
-            "createdAt": self.createdAt.isoformat(),
-            "updatedAt": self.updatedAt.isoformat(),
+            "createdAt": self.createdAt.isoformat(timespec="seconds"),
+            "updatedAt": self.updatedAt.isoformat(timespec="seconds"),
         }
\ No newline at end of file
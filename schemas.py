@@ -0,0 +1,54 @@
+# schemas.py
+# msgspec projections for list endpoints; rows are selected as plain tuples and
+# encoded straight to JSON, skipping ORM objects and to_dict(). Field order must
+# match the matching *_COLUMNS tuple.
+from typing import Optional
+
+import msgspec
+
+from models import Users, Agents, Models, iso_timestamp
+
+
+class AgentSummary(msgspec.Struct):
+    id: int
+    agentid: str
+    userId: int
+    name: str
+    status: str
+    port: Optional[int]
+    createdAt: str
+
+AGENT_SUMMARY_COLUMNS = (
+    Agents.id, Agents.agentid, Agents.userId, Agents.name, Agents.status, Agents.port,
+    iso_timestamp(Agents.createdAt),
+)
+
+
+class UserOut(msgspec.Struct):
+    id: int
+    name: str
+    email: str
+    email_verified: Optional[bool]
+    createdAt: str
+    updatedAt: str
+
+USER_COLUMNS = (
+    Users.id, Users.name, Users.email, Users.email_verified,
+    iso_timestamp(Users.createdAt), iso_timestamp(Users.updatedAt),
+)
+
+
+class ModelOut(msgspec.Struct):
+    id: int
+    name: str
+    code: str
+    provider: str
+    offline: Optional[bool]
+    endpoint: Optional[str]
+    createdAt: str
+    updatedAt: str
+
+MODEL_COLUMNS = (
+    Models.id, Models.name, Models.code, Models.provider, Models.offline, Models.endpoint,
+    iso_timestamp(Models.createdAt), iso_timestamp(Models.updatedAt),
+)
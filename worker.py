@@ -0,0 +1,64 @@
+# worker.py
+"""Pre-warmed agent worker.
+
+Spawned ahead of time by agent_pool.py so the interpreter start-up and the heavy
+agent imports are already paid for when an agent is started. The worker waits for
+a single JSON command on stdin, loads the generated agent file through
+base_agent.py, acknowledges on stdout and then serves that agent until it is
+stopped.
+"""
+import json
+import os
+import sys
+
+# Pre-import the shared agent server and the heavy dependencies it loads lazily
+import agno.agent  # noqa: F401
+import agno.models.groq  # noqa: F401
+import base_agent
+
+
+def reply(stream, **payload):
+    stream.write(json.dumps(payload) + "\n")
+    stream.flush()
+
+
+def main():
+    line = sys.stdin.readline()
+    if not line:
+        return 0 # Pool shut down before this worker was used
+
+    command = json.loads(line)
+    if command.get("op") != "load":
+        reply(sys.stdout, ok=False, error=f"Unknown op: {command.get('op')}")
+        return 1
+
+    # Keep a handle on the pipe for the ack, then send all agent output to its log file
+    ack = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    sys.stdout.flush()
+    sys.stderr.flush()
+    log_fd = os.open(command["log"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(log_fd, sys.stdout.fileno())
+    os.dup2(log_fd, sys.stderr.fileno())
+    os.close(log_fd)
+
+    port = int(command["port"])
+    os.environ["FLASK_PORT"] = str(port)
+
+    try:
+        config = base_agent.load_config(command["path"])
+        agent = base_agent.build_agent(config)
+    except BaseException as e: # Older full-source agent files call sys.exit() if the agent can't be built
+        print(f"Failed to load agent from {command['path']}: {e!r}", file=sys.stderr)
+        reply(ack, ok=False, error=repr(e))
+        return 1
+
+    reply(ack, ok=True, pid=os.getpid())
+    ack.close()
+
+    print(f"Starting agent from {command['path']} on port {port}...")
+    base_agent.create_app(config, agent).run(host='0.0.0.0', port=port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())